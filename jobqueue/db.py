@@ -1,22 +1,66 @@
 import sqlite3
 import os
 import threading
+import time
 from contextlib import contextmanager
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-from .models import Job, JobState
+from urllib.parse import quote
+from typing import List, Optional, Dict, Any, Tuple, Iterable, Iterator
+from .models import Job, JobState, utc_iso
 
 local_storage = threading.local()
 
 DB_PATH = os.environ.get("QUEUECTL_DB_PATH", "queue.db")
 
+# Output of jobs enqueued with capture_output goes to <LOG_DIR>/<job id>.log.
+LOG_DIR = os.environ.get(
+    "QUEUECTL_LOG_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "logs")
+)
+
+# Stored in PRAGMA user_version once init_db has brought the schema up to
+# date. Bump it whenever init_db gains a table, index or column.
+CURRENT_SCHEMA_VERSION = 1
+
+# Config values are read on every enqueue and every failure, so they are
+# cached per process. set_config bumps the version to drop local entries;
+# the TTL bounds how long a change made by another process goes unseen.
+CONFIG_CACHE_TTL = 5.0
+_config_version = 0
+_config_cache: Dict[str, Tuple[int, float, Optional[str]]] = {}
+_config_int_cache: Dict[Tuple[str, int], Tuple[int, float, int]] = {}
+
+# Worker processes are long-lived and hit the same index pages on every
+# poll, so they get a bigger page cache and read the file through mmap,
+# which shares clean pages between workers via the OS page cache.
+WORKER_CACHE_SIZE_KB = 65536
+WORKER_MMAP_SIZE = 256 * 1024 * 1024
+
+def open_connection(worker: bool = False) -> sqlite3.Connection:
+    """
+    Opens a new SQLite connection tuned for concurrent workers.
+    WAL lets readers run alongside the single writer; an in-memory
+    database has no journal to tune, so it is left as-is.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=10, cached_statements=128)
+    if DB_PATH != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        if worker:
+            conn.execute(f"PRAGMA cache_size=-{WORKER_CACHE_SIZE_KB}")
+            conn.execute(f"PRAGMA mmap_size={WORKER_MMAP_SIZE}")
+        else:
+            conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
 @contextmanager
 def get_db_connection():
     """
     Provides a transactional database connection.
     """
     if not hasattr(local_storage, "connection"):
-        local_storage.connection = sqlite3.connect(DB_PATH, timeout=10)
+        local_storage.connection = open_connection()
     
     try:
         yield local_storage.connection
@@ -24,10 +68,49 @@ def get_db_connection():
         local_storage.connection.rollback()
         raise
 
+@contextmanager
+def get_readonly_connection():
+    """
+    Provides a read-only connection for reports and lookups. In WAL mode
+    it reads from a snapshot and never waits on the workers' writes.
+    """
+    if DB_PATH == ":memory:":
+        # A second connection would see a different, empty database.
+        with get_db_connection() as conn:
+            yield conn
+        return
+    
+    if not hasattr(local_storage, "readonly_connection"):
+        uri = f"file:{quote(os.path.abspath(DB_PATH))}?mode=ro"
+        local_storage.readonly_connection = sqlite3.connect(
+            uri, uri=True, timeout=10, cached_statements=128
+        )
+    yield local_storage.readonly_connection
+
+def _exec(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+    """
+    Executes a statement on a cursor kept per SQL string, so hot queries
+    reuse both the cursor and the connection's compiled statement.
+    Callers must consume the results before running the same SQL again.
+    """
+    cursors = getattr(local_storage, "cursors", None)
+    if cursors is None:
+        cursors = local_storage.cursors = {}
+    cursor = cursors.get(sql)
+    if cursor is None or cursor.connection is not conn:
+        cursor = cursors[sql] = conn.cursor()
+    return cursor.execute(sql, params)
+
 def init_db():
-    """Initializes the database schema."""
+    """
+    Initializes the database schema. Runs on every CLI invocation, so a
+    database already at CURRENT_SCHEMA_VERSION is left untouched.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= CURRENT_SCHEMA_VERSION:
+            return
         
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS jobs (
@@ -38,16 +121,47 @@ def init_db():
             max_retries INTEGER NOT NULL,
             created_at TEXT NOT NULL,
             updated_at TEXT NOT NULL,
-            run_at TEXT
+            run_at TEXT,
+            capture_output INTEGER NOT NULL DEFAULT 0
         )
         """)
         
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_jobs_ready'")
+        new_indexes = cursor.fetchone() is None
+        
+        # Superseded by idx_jobs_ready, which also carries created_at.
+        cursor.execute("DROP INDEX IF EXISTS idx_jobs_fetch")
+        
         cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_jobs_fetch
-        ON jobs (state, run_at)
+        CREATE INDEX IF NOT EXISTS idx_jobs_ready
+        ON jobs (state, run_at, created_at)
         WHERE state IN ('pending', 'failed')
         """)
         
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_state_created
+        ON jobs (state, created_at)
+        """)
+        
+        if new_indexes:
+            cursor.execute("ANALYZE")
+        
+        # Finished jobs are moved here by archive_old_jobs() to keep the
+        # hot table (and its indexes) sized to the active workload.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs_archive (
+            id TEXT PRIMARY KEY,
+            command TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_retries INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            run_at TEXT,
+            capture_output INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS config (
             key TEXT PRIMARY KEY,
@@ -58,127 +172,276 @@ def init_db():
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS workers (
             pid INTEGER PRIMARY KEY,
-            started_at TEXT NOT NULL
+            started_at TEXT NOT NULL,
+            last_seen INTEGER
         )
         """)
+        
+        # Columns added after the first release; older databases get them here.
+        _add_column_if_missing(cursor, "jobs", "capture_output", "INTEGER NOT NULL DEFAULT 0")
+        _add_column_if_missing(cursor, "jobs_archive", "capture_output", "INTEGER NOT NULL DEFAULT 0")
+        _add_column_if_missing(cursor, "workers", "last_seen", "INTEGER")
+        
+        # Recorded last, so an interrupted upgrade is retried next time.
+        cursor.execute(f"PRAGMA user_version = {CURRENT_SCHEMA_VERSION}")
         conn.commit()
 
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, declaration: str):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
 # --- Config ---
 
 def set_config(key: str, value: str):
+    global _config_version
     with get_db_connection() as conn:
-        conn.execute(
+        _exec(
+            conn,
             "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
             (key, value)
         )
         conn.commit()
+    _config_version += 1
 
-def get_config(key: str, default: Optional[str] = None) -> Optional[str]:
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM config WHERE key = ?", (key,))
+def _is_fresh(entry: Optional[tuple]) -> bool:
+    return entry is not None and entry[0] == _config_version and entry[1] > time.monotonic()
+
+def _read_config(key: str) -> Optional[str]:
+    """Returns the stored value for key (or None), consulting the cache first."""
+    entry = _config_cache.get(key)
+    if _is_fresh(entry):
+        return entry[2]
+
+    with get_readonly_connection() as conn:
+        cursor = _exec(conn, "SELECT value FROM config WHERE key = ?", (key,))
         row = cursor.fetchone()
-        return row[0] if row else default
+
+    value = row[0] if row else None
+    _config_cache[key] = (_config_version, time.monotonic() + CONFIG_CACHE_TTL, value)
+    return value
+
+def get_config(key: str, default: Optional[str] = None) -> Optional[str]:
+    value = _read_config(key)
+    return value if value is not None else default
+
+def get_config_int(key: str, default: int) -> int:
+    """Like get_config, but caches the parsed integer."""
+    cache_key = (key, default)
+    entry = _config_int_cache.get(cache_key)
+    if _is_fresh(entry):
+        return entry[2]
+
+    value = _read_config(key)
+    parsed = int(value) if value is not None else int(default)
+    _config_int_cache[cache_key] = (_config_version, time.monotonic() + CONFIG_CACHE_TTL, parsed)
+    return parsed
+
+_TRUE_VALUES = frozenset({"true", "yes", "on"})
+
+def get_config_flag(key: str) -> bool:
+    """
+    Reads an on/off setting: true/yes/on (any case) or a non-zero integer
+    mean on. Anything else, including a missing key, means off.
+    """
+    value = _read_config(key)
+    if value is None:
+        return False
+    value = value.strip().lower()
+    if value in _TRUE_VALUES:
+        return True
+    try:
+        return int(value) != 0
+    except ValueError:
+        return False
 
 # --- Workers ---
 
+# Workers refresh last_seen (epoch seconds) every WORKER_HEARTBEAT_INTERVAL;
+# a row not refreshed within WORKER_TTL belongs to a worker that died
+# without unregistering. The TTL covers a heartbeat missed while a job
+# runs up to its 30s timeout.
+WORKER_HEARTBEAT_INTERVAL = 10
+WORKER_TTL = 60
+
 def register_worker(pid: int):
     with get_db_connection() as conn:
-        conn.execute(
-            "INSERT OR REPLACE INTO workers (pid, started_at) VALUES (?, ?)",
-            (pid, datetime.utcnow().isoformat())
+        _exec(
+            conn,
+            "INSERT OR REPLACE INTO workers (pid, started_at, last_seen) VALUES (?, ?, ?)",
+            (pid, utc_iso(), int(time.time()))
+        )
+        conn.commit()
+
+def heartbeat_worker(pid: int):
+    """Refreshes a worker's last_seen, re-registering it if its row is gone."""
+    with get_db_connection() as conn:
+        _exec(
+            conn,
+            """
+            INSERT INTO workers (pid, started_at, last_seen) VALUES (?, ?, ?)
+            ON CONFLICT (pid) DO UPDATE SET last_seen = excluded.last_seen
+            """,
+            (pid, utc_iso(), int(time.time()))
         )
         conn.commit()
 
 def unregister_worker(pid: int):
     with get_db_connection() as conn:
-        conn.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+        _exec(conn, "DELETE FROM workers WHERE pid = ?", (pid,))
         conn.commit()
 
-def get_active_workers() -> List[int]:
+def prune_dead_workers() -> int:
+    """Removes workers whose heartbeat has expired. Returns the number removed."""
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT pid FROM workers")
+        cursor = _exec(
+            conn,
+            "DELETE FROM workers WHERE last_seen IS NULL OR last_seen <= ?",
+            (int(time.time()) - WORKER_TTL,)
+        )
+        conn.commit()
+        return cursor.rowcount
+
+def get_active_workers() -> List[int]:
+    with get_readonly_connection() as conn:
+        cursor = _exec(
+            conn,
+            "SELECT pid FROM workers WHERE last_seen > ?",
+            (int(time.time()) - WORKER_TTL,)
+        )
         return [row[0] for row in cursor.fetchall()]
 
 # --- Jobs ---
 
+_JOB_COLUMNS = (
+    "id", "command", "state", "attempts", "max_retries",
+    "created_at", "updated_at", "run_at", "capture_output"
+)
+_JOB_COLUMN_LIST = ", ".join(_JOB_COLUMNS)
+_VALUES_ROW = "(" + ", ".join("?" * len(_JOB_COLUMNS)) + ")"
+
+_INSERT_JOB_SQL = f"""
+INSERT INTO jobs ({_JOB_COLUMN_LIST})
+VALUES {_VALUES_ROW}
+"""
+
+# Bulk inserts use multi-row VALUES, so each statement carries up to
+# _VALUES_CHUNK_SIZE jobs, bounded by the connection's bind-parameter limit.
+_VALUES_CHUNK_SIZE = 500
+
 def add_job(job: Job) -> Job:
     """Adds a new job to the queue."""
     with get_db_connection() as conn:
-        job.max_retries = int(get_config("max_retries", job.max_retries))
-        conn.execute(
-            """
-            INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at, run_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            job.to_row()
-        )
+        job.max_retries = get_config_int("max_retries", job.max_retries)
+        _exec(conn, _INSERT_JOB_SQL, job.to_row())
         conn.commit()
     return job
 
+def add_jobs(jobs: Iterable[Job]) -> List[Job]:
+    """Adds many jobs to the queue in a single transaction."""
+    jobs = list(jobs)
+    if not jobs:
+        return jobs
+    
+    for job in jobs:
+        job.max_retries = get_config_int("max_retries", job.max_retries)
+    
+    rows = [job.to_row() for job in jobs]
+    with get_db_connection() as conn:
+        max_rows = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) // len(_JOB_COLUMNS)
+        chunk_size = min(_VALUES_CHUNK_SIZE, max_rows)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            conn.execute(
+                f"INSERT INTO jobs ({_JOB_COLUMN_LIST}) VALUES " + ", ".join([_VALUES_ROW] * len(chunk)),
+                [value for row in chunk for value in row]
+            )
+        conn.commit()
+    return jobs
+
 def fetch_pending_job() -> Optional[Job]:
+    """Atomically fetches an available job and marks it as 'processing'."""
+    jobs = fetch_pending_jobs(1)
+    return jobs[0] if jobs else None
+
+def fetch_pending_jobs(limit: int) -> List[Job]:
     """
-    Atomically fetches an available job and marks it as 'processing'.
+    Atomically fetches up to `limit` available jobs, oldest first, and
+    marks them as 'processing'. The pick and the claim are a single
+    UPDATE, so the write lock is held for one statement only.
+    
+    Pending jobs and due retries are looked up separately so each side
+    is an in-order index walk that stops after `limit` rows: the oldest
+    pending jobs via idx_jobs_state_created, and the retries that came
+    due first via idx_jobs_ready. The latter is ordered by run_at, not
+    created_at, because a (state, run_at, created_at) index only yields
+    created_at order within one run_at value; sorting every due retry by
+    age would need a temp b-tree over all of them. Only the at most
+    2 * `limit` candidates are then sorted by age. The states are SQL
+    literals (and the failed branch repeats the index's IN clause)
+    because SQLite only uses a partial index when it can prove the
+    query's WHERE implies the index's.
     """
-    now = datetime.utcnow().isoformat()
+    now = utc_iso()
     
     with get_db_connection() as conn:
-        # Use an IMMEDIATE transaction to acquire a write lock immediately
-        conn.execute("BEGIN IMMEDIATE")
-        try:
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                """
-                SELECT id FROM jobs
-                WHERE (state = ? OR (state = ? AND run_at <= ?))
+        cursor = _exec(
+            conn,
+            """
+            UPDATE jobs
+            SET state = ?, updated_at = ?
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT * FROM (
+                        SELECT id, created_at FROM jobs
+                        WHERE state = 'pending'
+                        ORDER BY created_at ASC
+                        LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT id, created_at FROM jobs
+                        WHERE state IN ('pending', 'failed') AND state = 'failed' AND run_at <= ?
+                        ORDER BY run_at ASC
+                        LIMIT ?
+                    )
+                )
                 ORDER BY created_at ASC
-                LIMIT 1
-                """,
-                (JobState.PENDING.value, JobState.FAILED.value, now)
-            )
-            row = cursor.fetchone()
-            
-            if not row:
-                conn.commit()
-                return None
-                
-            job_id = row[0]
-            
-            cursor.execute(
-                """
-                UPDATE jobs
-                SET state = ?, updated_at = ?
-                WHERE id = ?
-                RETURNING *
-                """,
-                (JobState.PROCESSING.value, now, job_id)
+                LIMIT ?
             )
-            job_row = cursor.fetchone()
-            conn.commit()
-            
-            return Job.from_row(job_row)
-            
-        except Exception:
-            conn.rollback()
-            raise
-
-def update_job_success(job_id: str):
-    """Marks a job as 'completed'."""
-    with get_db_connection() as conn:
-        conn.execute(
-            "UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?",
-            (JobState.COMPLETED.value, datetime.utcnow().isoformat(), job_id)
+            RETURNING *
+            """,
+            (JobState.PROCESSING.value, now, limit, now, limit, limit)
         )
+        job_rows = cursor.fetchall()
         conn.commit()
+    
+    # RETURNING does not follow the subquery's order.
+    jobs = [Job.from_row(row) for row in job_rows]
+    jobs.sort(key=lambda job: job.created_at)
+    return jobs
 
-def update_job_failure(job: Job):
-    """Handles a failed job, incrementing attempts and setting up for retry or DLQ."""
+_SUCCESS_SQL = "UPDATE jobs SET state = ?, updated_at = ? WHERE id = ?"
+
+_FAILURE_SQL = """
+UPDATE jobs
+SET state = ?, attempts = ?, updated_at = ?, run_at = ?
+WHERE id = ?
+"""
+
+def job_success_row(job_id: str) -> tuple:
+    """Returns the parameters that mark a job as 'completed'."""
+    return (JobState.COMPLETED.value, utc_iso(), job_id)
+
+def job_failure_row(job: Job) -> tuple:
+    """
+    Increments attempts and schedules a retry (or moves the job to the DLQ),
+    returning the parameters for the matching UPDATE.
+    """
     job.attempts += 1
-    job.updated_at = datetime.utcnow().isoformat()
+    job.updated_at = utc_iso()
     
-    backoff_base = int(get_config("backoff_base", "2"))
+    backoff_base = get_config_int("backoff_base", 2)
     
     if job.attempts >= job.max_retries:
         job.state = JobState.DEAD
@@ -186,41 +449,106 @@ def update_job_failure(job: Job):
     else:
         job.state = JobState.FAILED
         delay_seconds = backoff_base ** job.attempts
-        job.run_at = (datetime.utcnow() + timedelta(seconds=delay_seconds)).isoformat()
-        
+        job.run_at = utc_iso(delay_seconds)
+    
+    return (job.state.value, job.attempts, job.updated_at, job.run_at, job.id)
+
+def update_job_success(job_id: str):
+    """Marks a job as 'completed'."""
     with get_db_connection() as conn:
-        conn.execute(
-            """
-            UPDATE jobs
-            SET state = ?, attempts = ?, updated_at = ?, run_at = ?
-            WHERE id = ?
-            """,
-            (job.state.value, job.attempts, job.updated_at, job.run_at, job.id)
-        )
+        _exec(conn, _SUCCESS_SQL, job_success_row(job_id))
+        conn.commit()
+
+def update_job_failure(job: Job):
+    """Handles a failed job, incrementing attempts and setting up for retry or DLQ."""
+    row = job_failure_row(job)
+    with get_db_connection() as conn:
+        _exec(conn, _FAILURE_SQL, row)
+        conn.commit()
+
+def flush_job_updates(successes: List[tuple], failures: List[tuple]):
+    """
+    Applies buffered success/failure rows (see job_success_row and
+    job_failure_row) in a single transaction.
+    """
+    if not successes and not failures:
+        return
+    
+    with get_db_connection() as conn:
+        if successes:
+            conn.executemany(_SUCCESS_SQL, successes)
+        if failures:
+            conn.executemany(_FAILURE_SQL, failures)
         conn.commit()
 
 def requeue_job(job_id: str) -> bool:
     """Resets a 'dead' job back to 'pending' to be retried."""
     with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+        cursor = _exec(
+            conn,
             """
             UPDATE jobs
             SET state = ?, attempts = 0, updated_at = ?, run_at = NULL
             WHERE id = ? AND state = ?
             """,
-            (JobState.PENDING.value, datetime.utcnow().isoformat(), job_id, JobState.DEAD.value)
+            (JobState.PENDING.value, utc_iso(), job_id, JobState.DEAD.value)
         )
         conn.commit()
         return cursor.rowcount > 0
 
+def release_jobs(job_ids: List[str]):
+    """
+    Hands claimed jobs that never started back to 'pending', leaving
+    their attempts untouched.
+    """
+    if not job_ids:
+        return
+    now = utc_iso()
+    with get_db_connection() as conn:
+        conn.executemany(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE id = ? AND state = ?",
+            [(JobState.PENDING.value, now, job_id, JobState.PROCESSING.value) for job_id in job_ids]
+        )
+        conn.commit()
+
+def archive_old_jobs(older_than_days: float = 7) -> int:
+    """
+    Moves 'completed' and 'dead' jobs last updated more than
+    older_than_days ago into jobs_archive. Returns the number moved.
+    """
+    cutoff = utc_iso(-older_than_days * 86400)
+    params = (JobState.COMPLETED.value, JobState.DEAD.value, cutoff)
+    
+    with get_db_connection() as conn:
+        _exec(
+            conn,
+            f"""
+            INSERT OR REPLACE INTO jobs_archive ({_JOB_COLUMN_LIST})
+            SELECT {_JOB_COLUMN_LIST} FROM jobs
+            WHERE state IN (?, ?) AND updated_at < ?
+            """,
+            params
+        )
+        cursor = _exec(conn, "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?", params)
+        archived = cursor.rowcount
+        conn.commit()
+        
+        if archived:
+            # Copy the archive's WAL frames into the database now rather than
+            # at the next autocheckpoint, so the WAL can be reused from the
+            # start. PASSIVE never waits on readers, which matters because
+            # this runs on a worker's (or the writer's) hot path. The deleted
+            # rows' pages go to the database's free list for reuse; the file
+            # itself does not shrink.
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    return archived
+
 # --- Stats & Listing ---
 
 def get_job_stats() -> Dict[str, int]:
     """Gets a count of jobs by state."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+    with get_readonly_connection() as conn:
+        cursor = _exec(conn, "SELECT state, COUNT(*) FROM jobs GROUP BY state")
         
         stats = {state.value: 0 for state in JobState}
         stats.update(dict(cursor.fetchall()))
@@ -228,10 +556,26 @@ def get_job_stats() -> Dict[str, int]:
 
 def list_jobs(state: JobState) -> List[Job]:
     """Lists all jobs with a given state."""
-    with get_db_connection() as conn:
+    with get_readonly_connection() as conn:
+        cursor = _exec(
+            conn,
+            "SELECT * FROM jobs WHERE state = ? ORDER BY created_at ASC",
+            (state.value,)
+        )
+        return [Job.from_row(row) for row in cursor.fetchall()]
+
+def iter_jobs(state: JobState) -> Iterator[sqlite3.Row]:
+    """
+    Yields the raw rows for jobs with a given state, oldest first, without
+    building Job objects. Rows support access by column name.
+    """
+    with get_readonly_connection() as conn:
+        # A private cursor: the shared ones from _exec can't be held open
+        # across yields.
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         cursor.execute(
-            "SELECT * FROM jobs WHERE state = ? ORDER BY created_at ASC",
+            "SELECT id, command, attempts, updated_at FROM jobs WHERE state = ? ORDER BY created_at ASC",
             (state.value,)
         )
-        return [Job.from_row(row) for row in cursor.fetchall()]
\ No newline at end of file
+        yield from cursor
@@ -0,0 +1,122 @@
+import json
+import os
+import select
+import subprocess
+from typing import Dict, List
+
+# Runs inside the long-lived interpreter. It keeps private copies of the
+# stdin/stdout pipes for the request/response protocol and points fds 0-2
+# at /dev/null, so job output is discarded just like a captured run.
+# Each request runs in fresh globals; the reply is the job's exit code.
+_SIDECAR_SOURCE = r"""
+import builtins, json, os, sys, traceback
+proto_in = os.fdopen(os.dup(0), "r")
+proto_out = os.fdopen(os.dup(1), "w")
+null = os.open(os.devnull, os.O_RDWR)
+for fd in (0, 1, 2):
+    os.dup2(null, fd)
+home = os.getcwd()
+for line in proto_in:
+    request = json.loads(line)
+    sys.argv = request["argv"]
+    code = 0
+    try:
+        exec(compile(request["code"], "<string>", "exec"),
+             {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as e:
+        # Same exit status a fresh `python -c` would report.
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code & 0xFF
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.chdir(home)
+    proto_out.write(json.dumps({"returncode": code}) + "\n")
+    proto_out.flush()
+"""
+
+POOL_INTERPRETERS = frozenset({"python", "python3"})
+
+
+def is_poolable(argv: List[str]) -> bool:
+    """True for `python -c <code> [args...]` style commands."""
+    return (
+        len(argv) >= 3
+        and os.path.basename(argv[0]) in POOL_INTERPRETERS
+        and argv[1] == "-c"
+    )
+
+
+class InterpreterPool:
+    """
+    Keeps one long-lived interpreter per executable and feeds it
+    `python -c` payloads over a pipe, skipping interpreter startup.
+    Jobs share the interpreter's module state, so this is opt-in.
+    """
+    def __init__(self):
+        self._procs: Dict[str, subprocess.Popen] = {}
+
+    def _get(self, executable: str) -> subprocess.Popen:
+        proc = self._procs.get(executable)
+        if proc is None or proc.poll() is not None:
+            proc = subprocess.Popen(
+                [executable, "-c", _SIDECAR_SOURCE],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True
+            )
+            self._procs[executable] = proc
+        return proc
+
+    def _discard(self, executable: str):
+        proc = self._procs.pop(executable, None)
+        if proc and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    def run(self, executable: str, argv: List[str], timeout: float) -> int:
+        """
+        Runs argv (see is_poolable) in the pooled interpreter and returns
+        its exit code. Raises subprocess.TimeoutExpired like subprocess.run.
+        """
+        proc = self._get(executable)
+        request = {"code": argv[2], "argv": ["-c", *argv[3:]]}
+        try:
+            proc.stdin.write(json.dumps(request) + "\n")
+            proc.stdin.flush()
+        except BrokenPipeError:
+            self._discard(executable)
+            proc = self._get(executable)
+            proc.stdin.write(json.dumps(request) + "\n")
+            proc.stdin.flush()
+
+        ready, _, _ = select.select([proc.stdout], [], [], timeout)
+        if not ready:
+            self._discard(executable)
+            raise subprocess.TimeoutExpired(argv, timeout)
+
+        line = proc.stdout.readline()
+        if not line:
+            # The job took the interpreter down with it (os._exit, crash).
+            self._procs.pop(executable, None)
+            return proc.wait()
+        return json.loads(line)["returncode"]
+
+    def close(self):
+        """Stops all pooled interpreters."""
+        for proc in self._procs.values():
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+                proc.wait()
+        self._procs.clear()
@@ -1,7 +1,24 @@
 import enum
+import time
 import uuid
 from dataclasses import dataclass, field
-from datetime import datetime
+
+_iso_prefix_cache: tuple = (None, "")
+
+def utc_iso(offset_seconds: float = 0) -> str:
+    """
+    Returns the current UTC time (plus an optional offset) in the same
+    format as datetime.utcnow().isoformat(), always with microseconds.
+    The seconds part is formatted once per second and reused.
+    """
+    global _iso_prefix_cache
+    micros = time.time_ns() // 1000 + int(offset_seconds * 1_000_000)
+    seconds, fraction = divmod(micros, 1_000_000)
+    cached_seconds, prefix = _iso_prefix_cache
+    if seconds != cached_seconds:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _iso_prefix_cache = (seconds, prefix)
+    return f"{prefix}.{fraction:06d}"
 
 class JobState(str, enum.Enum):
     """Enumeration of possible job states."""
@@ -11,7 +28,7 @@ class JobState(str, enum.Enum):
     FAILED = "failed"
     DEAD = "dead"
 
-@dataclass
+@dataclass(slots=True)
 class Job:
     """Dataclass representing a job."""
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -19,27 +36,36 @@ class Job:
     state: JobState = JobState.PENDING
     attempts: int = 0
     max_retries: int = 3
-    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
-    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    created_at: str = field(default_factory=utc_iso)
+    updated_at: str = field(default_factory=utc_iso)
     run_at: str | None = None  # For scheduled retries
+    capture_output: bool = False  # Keep stdout/stderr in a per-job log file
+
+    @classmethod
+    def new(cls, command: str, max_retries: int = 3, id: str | None = None,
+            capture_output: bool = False) -> "Job":
+        """Creates a fresh pending job, generating an id unless one is given."""
+        if id is None:
+            return cls(command=command, max_retries=max_retries, capture_output=capture_output)
+        return cls(id=id, command=command, max_retries=max_retries, capture_output=capture_output)
 
     def to_row(self):
         """Converts the Job object to a tuple for database insertion."""
         return (
             self.id, self.command, self.state.value, self.attempts,
-            self.max_retries, self.created_at, self.updated_at, self.run_at
+            self.max_retries, self.created_at, self.updated_at, self.run_at,
+            int(self.capture_output)
         )
 
     @staticmethod
     def from_row(row: tuple):
-        """Creates a Job object from a database row tuple."""
-        return Job(
-            id=row[0],
-            command=row[1],
-            state=JobState(row[2]),
-            attempts=row[3],
-            max_retries=row[4],
-            created_at=row[5],
-            updated_at=row[6],
-            run_at=row[7]
-        )
\ No newline at end of file
+        """
+        Creates a Job object from a database row tuple. Bypasses __init__
+        since every field comes from the row.
+        """
+        job = Job.__new__(Job)
+        (job.id, job.command, state, job.attempts, job.max_retries,
+         job.created_at, job.updated_at, job.run_at, capture_output) = row
+        job.state = JobState(state)
+        job.capture_output = bool(capture_output)
+        return job
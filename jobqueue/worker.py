@@ -1,22 +1,128 @@
 import subprocess
 import time
 import os
+import re
+import select
+import errno
+import shlex
+import shutil
+import functools
+import contextlib
 import signal
 import sqlite3
+import threading
 from typing import Optional
 import multiprocessing
 
 from . import db
+from .interp_pool import InterpreterPool, is_poolable
 from .models import Job
+from .writer import WriterChannel, start_writer_process
+
+# Idle polls back off exponentially so an empty queue doesn't cost every
+# worker a write lock per second; any successful fetch resets the delay.
+MIN_IDLE_SLEEP = 0.1
+MAX_IDLE_SLEEP = 2.0
+
+# Job results are buffered and written in one transaction once this many
+# are pending or this many seconds have passed since the last write.
+FLUSH_BATCH_SIZE = 16
+FLUSH_INTERVAL = 0.5
+
+# Every this many processed jobs, a worker moves old finished jobs into
+# the archive table (see db.archive_old_jobs).
+ARCHIVE_EVERY_JOBS = 1000
+ARCHIVE_OLDER_THAN_DAYS = 7
+
+# The foreground manager checks on its children at least this often,
+# besides whenever one exits.
+MANAGER_POLL_INTERVAL = 1.0
+
+# Commands containing any of these, or starting with a shell builtin or
+# keyword, keep running through /bin/sh. Everything else is exec'd directly.
+_SHELL_CHARS = frozenset("|&;<>()$`\\*?[]{}~#!\n")
+_SHELL_WORDS = frozenset({
+    ".", ":", "alias", "bg", "break", "case", "cd", "command", "continue",
+    "do", "done", "elif", "else", "esac", "eval", "exec", "exit", "export",
+    "fc", "fg", "fi", "for", "function", "getopts", "hash", "if", "jobs",
+    "read", "readonly", "return", "select", "set", "shift", "source", "then",
+    "time", "times", "trap", "type", "ulimit", "umask", "unalias", "unset",
+    "until", "wait", "while",
+})
+# Quoted text the shell would pass through literally: anything in single
+# quotes, or double quotes without expansions or escapes.
+_LITERAL_QUOTED = re.compile(r"'[^']*'|" r'"[^"$`\\]*"')
+
+@functools.lru_cache(maxsize=1024)
+def direct_argv(command: str) -> Optional[tuple[str, list[str]]]:
+    """
+    Returns (executable, argv) when the command can be run without a
+    shell, or None when it needs /bin/sh. The executable is resolved to
+    a full path, which lets subprocess launch it with posix_spawn.
+    """
+    if any(ch in _SHELL_CHARS for ch in _LITERAL_QUOTED.sub("", command)):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in _SHELL_WORDS or "=" in argv[0]:
+        return None
+    executable = shutil.which(argv[0])
+    if executable is None:
+        # Let the shell report it (exit code 127), as before.
+        return None
+    return executable, argv
+
+def log_file_name(job_id: str) -> str:
+    """
+    Returns the log file name for a capture_output job. Ids come straight
+    from the enqueue JSON, so one that is not a plain file name (and could
+    point the log outside LOG_DIR) raises ValueError.
+    """
+    name = os.path.basename(job_id)
+    if name != job_id or name in ("", ".", "..") or (os.altsep and os.altsep in name):
+        raise ValueError(f"job id {job_id!r} can't be used as a log file name")
+    return f"{name}.log"
+
+@contextlib.contextmanager
+def open_job_output(job: Job):
+    """
+    Yields the stdout target for a job: DEVNULL by default, or an
+    append-mode <LOG_DIR>/<job id>.log when the job set capture_output.
+    """
+    if not job.capture_output:
+        yield subprocess.DEVNULL
+        return
+    # Enqueue already refuses bad ids; this guards rows written otherwise.
+    name = log_file_name(job.id)
+    os.makedirs(db.LOG_DIR, exist_ok=True)
+    with open(os.path.join(db.LOG_DIR, name), "ab") as log_file:
+        yield log_file
+
 
 class Worker:
     """
     A Worker process that fetches and executes jobs.
+    
+    Database writes go through `store`: the db module itself, or a
+    WriterChannel when a writer process does the writing for this worker.
     """
-    def __init__(self):
+    def __init__(self, store=None):
         self.pid = os.getpid()
+        self.store = store if store is not None else db
+        # The writer batches across all workers, so results go to it at once.
+        self._flush_batch_size = FLUSH_BATCH_SIZE if self.store is db else 1
         self.running = True
         self.current_job: Optional[Job] = None
+        self._idle_sleep = MIN_IDLE_SLEEP
+        self._stop_event = threading.Event()
+        self._pending_success: list[tuple] = []
+        self._pending_fail: list[tuple] = []
+        self._last_flush = time.monotonic()
+        self._jobs_since_archive = 0
+        self._last_heartbeat = time.monotonic()
+        self._interp_pool = InterpreterPool()
         
     def setup_signal_handlers(self):
         """Sets up graceful shutdown handlers."""
@@ -30,104 +136,266 @@ class Worker:
         else:
             print(f"[Worker {self.pid}] Shutdown signal received. Exiting...")
         self.running = False
+        self._stop_event.set()
 
     def run(self):
         """The main worker loop."""
         self.setup_signal_handlers()
-        db.register_worker(self.pid)
+        self.store.prune_dead_workers()
+        self.store.register_worker(self.pid)
         print(f"[Worker {self.pid}] Started and registered.")
         
         try:
             while self.running:
-                job = db.fetch_pending_job()
+                self.maybe_heartbeat()
+                job = self.store.fetch_pending_job()
                 
                 if job:
+                    self._idle_sleep = MIN_IDLE_SLEEP
                     self.current_job = job
                     print(f"[Worker {self.pid}] Processing job {job.id}: {job.command}")
                     self.execute_job(job)
                     self.current_job = None
+                    self.maybe_flush()
+                    self.maybe_archive()
                 else:
+                    self.flush_updates()
                     if self.running:
-                        time.sleep(1) 
+                        self._stop_event.wait(self._idle_sleep)
+                        self._idle_sleep = min(self._idle_sleep * 2, MAX_IDLE_SLEEP)
             
         except Exception as e:
             print(f"[Worker {self.pid}] Error in main loop: {e}")
         finally:
-            db.unregister_worker(self.pid)
+            self._interp_pool.close()
+            self.flush_updates()
+            self.store.unregister_worker(self.pid)
             print(f"[Worker {self.pid}] Stopped and unregistered.")
 
+    def maybe_heartbeat(self):
+        """Refreshes this worker's registration every WORKER_HEARTBEAT_INTERVAL."""
+        now = time.monotonic()
+        if now - self._last_heartbeat >= db.WORKER_HEARTBEAT_INTERVAL:
+            self.store.heartbeat_worker(self.pid)
+            self._last_heartbeat = now
+
+    def maybe_flush(self):
+        """Flushes buffered results once the batch is full or stale."""
+        pending = len(self._pending_success) + len(self._pending_fail)
+        if pending >= self._flush_batch_size or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush_updates()
+
+    def flush_updates(self):
+        """Writes all buffered job results in one transaction."""
+        if self._pending_success or self._pending_fail:
+            self.store.flush_job_updates(self._pending_success, self._pending_fail)
+            self._pending_success = []
+            self._pending_fail = []
+        self._last_flush = time.monotonic()
+
+    def maybe_archive(self):
+        """Archives old finished jobs every ARCHIVE_EVERY_JOBS jobs."""
+        self._jobs_since_archive += 1
+        if self._jobs_since_archive < ARCHIVE_EVERY_JOBS:
+            return
+        self._jobs_since_archive = 0
+        self.flush_updates()
+        try:
+            archived = self.store.archive_old_jobs(ARCHIVE_OLDER_THAN_DAYS)
+            if archived:
+                print(f"[Worker {self.pid}] Archived {archived} old job(s).")
+        except sqlite3.Error as e:
+            print(f"[Worker {self.pid}] Archiving failed: {e}")
+
+    def record_success(self, job: Job):
+        self._pending_success.append(db.job_success_row(job.id))
+
+    def record_failure(self, job: Job):
+        self._pending_fail.append(db.job_failure_row(job))
+
+    def run_command(self, args, timeout: float, **kwargs) -> int:
+        """
+        Like subprocess.run(args, timeout=timeout, **kwargs).returncode,
+        except that results buffered from earlier jobs are written once
+        this job has run for FLUSH_INTERVAL, rather than after it ends.
+        """
+        deadline = time.monotonic() + timeout
+        with subprocess.Popen(args, **kwargs) as proc:
+            try:
+                if self._pending_success or self._pending_fail:
+                    try:
+                        return proc.wait(timeout=min(FLUSH_INTERVAL, timeout))
+                    except subprocess.TimeoutExpired:
+                        try:
+                            self.flush_updates()
+                        except sqlite3.Error as e:
+                            # Still buffered; the next flush retries them.
+                            print(f"[Worker {self.pid}] Flushing results failed: {e}")
+                return proc.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                raise
+
     def execute_job(self, job: Job):
         """Executes the job's command using subprocess."""
         try:
-            result = subprocess.run(
-                job.command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            direct = direct_argv(job.command)
+            if (direct and not job.capture_output and is_poolable(direct[1])
+                    and db.get_config_flag("python_pool")):
+                # Opt-in: `python -c` jobs reuse a long-lived interpreter.
+                # The pool can't flush mid-job, so earlier results go first.
+                self.flush_updates()
+                returncode = self._interp_pool.run(*direct, timeout=30)
+            else:
+                # Output is discarded unless the job asked for it, so the
+                # worker never buffers it in memory.
+                with open_job_output(job) as output:
+                    returncode = None
+                    if direct:
+                        executable, argv = direct
+                        try:
+                            # close_fds=False is required for posix_spawn; descriptors
+                            # opened by Python and SQLite are close-on-exec anyway.
+                            returncode = self.run_command(
+                                argv,
+                                timeout=30,
+                                executable=executable,
+                                close_fds=False,
+                                stdout=output,
+                                stderr=subprocess.STDOUT
+                            )
+                        except OSError as e:
+                            # A script without a #! line can't be exec'd;
+                            # /bin/sh runs it as a shell script instead.
+                            if e.errno != errno.ENOEXEC:
+                                raise
+                    if returncode is None:
+                        returncode = self.run_command(
+                            job.command,
+                            timeout=30,
+                            shell=True,
+                            stdout=output,
+                            stderr=subprocess.STDOUT
+                        )
             
-            if result.returncode == 0:
+            if returncode == 0:
                 print(f"[Worker {self.pid}] Job {job.id} completed successfully.")
-                db.update_job_success(job.id)
+                self.record_success(job)
             else:
-                print(f"[Worker {self.pid}] Job {job.id} failed (exit code {result.returncode}).")
-                db.update_job_failure(job)
+                print(f"[Worker {self.pid}] Job {job.id} failed (exit code {returncode}).")
+                self.record_failure(job)
                 
         except subprocess.TimeoutExpired:
             print(f"[Worker {self.pid}] Job {job.id} timed out.")
-            db.update_job_failure(job)
+            self.record_failure(job)
         except Exception as e:
             print(f"[Worker {self.pid}] Job {job.id} execution error: {e}")
-            db.update_job_failure(job)
+            self.record_failure(job)
 
 
-def start_worker_process():
-    """Entry point for the multiprocessing.Process."""
+def start_worker_process(channel: Optional[WriterChannel] = None):
+    """
+    Entry point for the multiprocessing.Process. With a channel, the
+    worker only executes jobs and leaves all writes to the writer process.
+    """
+    # The manager's signal setup is inherited across fork; a worker
+    # must not run its SIGCHLD handler for its own job subprocesses.
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    
     # Each process must have its own DB connection.
-    db.local_storage.connection = sqlite3.connect(db.DB_PATH, timeout=10)
+    db.local_storage.connection = db.open_connection(worker=True)
+    db.local_storage.__dict__.pop("readonly_connection", None)
     
-    worker = Worker()
+    worker = Worker(store=channel)
     worker.run()
 
 def run_workers_foreground(count: int):
     """
     Starts and manages 'count' worker processes in the foreground.
     This function is designed to be the main process in a container.
+    
+    The workers only execute jobs; a separate writer process performs
+    every database write for them (see jobqueue.writer).
     """
     print(f"[Manager] Starting {count} worker(s) in foreground mode...")
+    # One pipe per worker slot. A restarted worker (or writer) takes over
+    # its predecessor's end, including a job the writer already sent it.
+    pipes = [multiprocessing.Pipe() for _ in range(count)]
     processes: list[multiprocessing.Process] = []
-    
-    for _ in range(count):
-        p = multiprocessing.Process(target=start_worker_process)
+
+    def start_writer(restarted: bool = False) -> multiprocessing.Process:
+        p = multiprocessing.Process(
+            target=start_writer_process,
+            args=([writer_end for writer_end, _ in pipes], restarted)
+        )
+        p.start()
+        return p
+
+    def start_worker(slot: int) -> multiprocessing.Process:
+        channel = WriterChannel(pipes[slot][1])
+        p = multiprocessing.Process(target=start_worker_process, args=(channel,))
         p.start()
+        return p
+
+    def respawn_dead_workers():
+        # is_alive() reaps through multiprocessing itself, keeping its
+        # bookkeeping consistent.
+        nonlocal writer
+        if not writer.is_alive():
+            print(f"[Manager] Writer {writer.pid} died unexpectedly. Restarting...")
+            writer = start_writer(restarted=True)
+            print(f"[Manager] Started new writer PID: {writer.pid}")
+        for i, p in enumerate(processes):
+            if not p.is_alive():
+                print(f"[Manager] Worker {p.pid} died unexpectedly. Restarting...")
+                processes[i] = start_worker(i)
+                print(f"[Manager] Started new worker PID: {processes[i].pid}")
+
+    def request_shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    # Signal handlers only record the signal; Python then writes a byte to
+    # the wakeup fd, which wakes the loop below. Respawning and shutdown
+    # happen in that loop, where a second signal can't re-enter them.
+    stopping = False
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+    
+    writer = start_writer()
+    print(f"[Manager] Started writer PID: {writer.pid}")
+    for slot in range(count):
+        p = start_worker(slot)
         processes.append(p)
         print(f"[Manager] Started worker PID: {p.pid}")
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
 
-    def shutdown_gracefully(signum, frame):
-        print(f"[Manager] Shutdown signal received. Terminating {len(processes)} workers...")
-        for p in processes:
-            p.terminate() # Sends SIGTERM to child
-        for p in processes:
-            p.join() # Waits for child to exit
-        print("[Manager] All workers shut down. Exiting.")
-        exit(0)
-
-    signal.signal(signal.SIGINT, shutdown_gracefully)
-    signal.signal(signal.SIGTERM, shutdown_gracefully)
+    # The timeout also catches a child that exited before the SIGCHLD
+    # handler was installed.
+    while not stopping:
+        select.select([wakeup_r], [], [], MANAGER_POLL_INTERVAL)
+        try:
+            while os.read(wakeup_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+        if not stopping:
+            respawn_dead_workers()
 
-    # Keep this main process alive to monitor children
-    try:
-        while True:
-            # Check if any worker died unexpectedly and restart them
-            for p in processes:
-                if not p.is_alive():
-                    print(f"[Manager] Worker {p.pid} died unexpectedly. Restarting...")
-                    processes.remove(p)
-                    new_p = multiprocessing.Process(target=start_worker_process)
-                    new_p.start()
-                    processes.append(new_p)
-                    print(f"[Manager] Started new worker PID: {new_p.pid}")
-            time.sleep(5) # Poll every 5 seconds
-    except KeyboardInterrupt:
-        pass # Will be caught by signal handler
\ No newline at end of file
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    print(f"[Manager] Shutdown signal received. Terminating {len(processes)} workers...")
+    for p in processes:
+        p.terminate() # Sends SIGTERM to child
+    for p in processes:
+        p.join() # Waits for child to exit
+    # The workers' final results are in the pipes by now; the
+    # writer commits them before it exits.
+    writer.terminate()
+    writer.join()
+    signal.set_wakeup_fd(-1)
+    print("[Manager] All workers shut down. Exiting.")
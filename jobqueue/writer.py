@@ -0,0 +1,225 @@
+import os
+import signal
+import sqlite3
+import time
+from multiprocessing.connection import Connection, wait
+from typing import List, Optional
+
+from . import db
+from .models import Job
+
+# The writer handles up to this many requests per round, waiting at most
+# WRITER_POLL_INTERVAL for the first one, and commits their results together.
+WRITER_BATCH_SIZE = 64
+WRITER_POLL_INTERVAL = 0.05
+
+# An executor waiting this long for a job gives up, idles as if the
+# queue were empty and then asks again. It is above the 10s busy timeout
+# a writer round can spend on its flush and again on its fetch, so a
+# slow but healthy writer rarely hits it, and when it does the late
+# answer is only handed back. A request lost with a killed writer is
+# re-sent as soon as the replacement announces itself (RESTART_NOTICE).
+FETCH_TIMEOUT = 30.0
+
+# Sent down every pipe by a writer that replaces a dead one.
+RESTART_NOTICE = (None, None)
+
+# db functions an executor may ask the writer to call on its behalf.
+_FORWARDED_CALLS = frozenset({
+    "register_worker",
+    "heartbeat_worker",
+    "unregister_worker",
+    "prune_dead_workers",
+    "archive_old_jobs",
+    "release_jobs",
+})
+
+
+class WriterChannel:
+    """
+    Executor-side stand-in for the db module's write functions. Every
+    call becomes a message to the writer process over this executor's
+    own pipe; only fetch_pending_job waits for an answer.
+
+    Each executor gets its own pipe rather than sharing one queue: a
+    multiprocessing.Queue's lock stays held forever if its reader is
+    killed mid-read, which would wedge every executor.
+    """
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self._requests = 0
+
+    def fetch_pending_job(self) -> Optional[Job]:
+        # Requests are tagged with (pid, counter), which stays unique when
+        # a restarted worker takes over this pipe. Any other reply answers
+        # a request that was given up on, by this worker or a dead
+        # predecessor; its job was claimed but never started, so it is
+        # handed back rather than left in 'processing'.
+        tag = self._send_fetch()
+        deadline = time.monotonic() + FETCH_TIMEOUT
+        while self.conn.poll(max(deadline - time.monotonic(), 0)):
+            reply_tag, job = self.conn.recv()
+            if reply_tag == tag:
+                return job
+            if reply_tag is None:
+                # The writer was replaced and may have taken our request
+                # with it; ask the new one.
+                tag = self._send_fetch()
+            elif job is not None:
+                self.release_jobs([job.id])
+        return None
+
+    def _send_fetch(self) -> tuple:
+        self._requests += 1
+        tag = (os.getpid(), self._requests)
+        self.conn.send(("fetch", tag))
+        return tag
+
+    def flush_job_updates(self, successes: List[tuple], failures: List[tuple]):
+        if successes or failures:
+            self.conn.send(("results", successes, failures))
+
+    def register_worker(self, pid: int):
+        self.conn.send(("register_worker", pid))
+
+    def heartbeat_worker(self, pid: int):
+        self.conn.send(("heartbeat_worker", pid))
+
+    def unregister_worker(self, pid: int):
+        self.conn.send(("unregister_worker", pid))
+
+    def prune_dead_workers(self) -> int:
+        self.conn.send(("prune_dead_workers",))
+        return 0
+
+    def archive_old_jobs(self, older_than_days: float = 7) -> int:
+        # The writer reports what it archived; the executor doesn't wait.
+        self.conn.send(("archive_old_jobs", older_than_days))
+        return 0
+
+    def release_jobs(self, job_ids: List[str]):
+        self.conn.send(("release_jobs", job_ids))
+
+
+class DBWriter:
+    """
+    The only process that writes to the database in foreground mode.
+    SQLite serializes writers anyway, so instead of N executors taking
+    turns on the write lock, the writer claims jobs for them and commits
+    everyone's results in one transaction per round.
+
+    Results that fail to commit (e.g. the database stayed locked past the
+    busy timeout) are kept and retried every round. Results a writer has
+    read but not yet committed are lost if it is killed; those jobs stay
+    in 'processing'.
+    """
+    def __init__(self, conns: List[Connection], restarted: bool = False):
+        self.pid = os.getpid()
+        self.conns = conns
+        self.restarted = restarted
+        self.running = True
+        self._unsaved_successes: List[tuple] = []
+        self._unsaved_failures: List[tuple] = []
+
+    def handle_shutdown(self, signum, frame):
+        self.running = False
+
+    def run(self):
+        """Serves requests until SIGTERM, then writes what is still queued."""
+        # Ctrl-C reaches the whole process group; the manager stops the
+        # writer itself once the executors have sent their last results.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self.handle_shutdown)
+        print(f"[Writer {self.pid}] Started.")
+        if self.restarted:
+            for conn in self.conns:
+                conn.send(RESTART_NOTICE)
+
+        while self.running:
+            self.process(self.next_batch(WRITER_POLL_INTERVAL))
+
+        batch = self.next_batch(0)
+        while batch:
+            self.process(batch)
+            batch = self.next_batch(0)
+        if self._unsaved_successes or self._unsaved_failures:
+            self.process([])
+        unsaved = len(self._unsaved_successes) + len(self._unsaved_failures)
+        if unsaved:
+            print(f"[Writer {self.pid}] {unsaved} result(s) could not be recorded; those jobs stay 'processing'.")
+        print(f"[Writer {self.pid}] Stopped.")
+
+    def next_batch(self, timeout: float) -> list:
+        """
+        Collects up to WRITER_BATCH_SIZE (conn, message) pairs, waiting
+        at most `timeout` for the first one.
+        """
+        batch = []
+        for conn in wait(self.conns, timeout):
+            try:
+                while len(batch) < WRITER_BATCH_SIZE and conn.poll():
+                    batch.append((conn, conn.recv()))
+            except (EOFError, OSError):
+                # Only reachable if the manager closed its copy of the pipe.
+                self.conns.remove(conn)
+        return batch
+
+    def process(self, batch: list):
+        """
+        Applies one round of requests. Results are committed before any
+        job is handed out, so a retry is never claimed ahead of its own
+        failure being recorded.
+        """
+        successes = self._unsaved_successes
+        failures = self._unsaved_failures
+        fetches: List[tuple] = []
+
+        for conn, message in batch:
+            kind = message[0]
+            if kind == "results":
+                successes.extend(message[1])
+                failures.extend(message[2])
+            elif kind == "fetch":
+                fetches.append((conn, message[1]))
+            elif kind in _FORWARDED_CALLS:
+                self.call(kind, message[1:])
+
+        if successes or failures:
+            try:
+                db.flush_job_updates(successes, failures)
+            except sqlite3.Error as e:
+                print(f"[Writer {self.pid}] Failed to record {len(successes) + len(failures)} result(s), will retry: {e}")
+            else:
+                self._unsaved_successes = []
+                self._unsaved_failures = []
+
+        if fetches:
+            # One UPDATE claims a job for every executor that asked.
+            try:
+                jobs = db.fetch_pending_jobs(len(fetches))
+            except sqlite3.Error as e:
+                print(f"[Writer {self.pid}] Fetch failed: {e}")
+                jobs = []
+            for i, (conn, tag) in enumerate(fetches):
+                conn.send((tag, jobs[i] if i < len(jobs) else None))
+
+    def call(self, name: str, args: tuple):
+        try:
+            result = getattr(db, name)(*args)
+        except sqlite3.Error as e:
+            print(f"[Writer {self.pid}] {name} failed: {e}")
+            return
+        if name == "archive_old_jobs" and result:
+            print(f"[Writer {self.pid}] Archived {result} old job(s).")
+
+
+def start_writer_process(conns: List[Connection], restarted: bool = False):
+    """
+    Entry point for the writer's multiprocessing.Process. `restarted`
+    marks a writer that replaces one that died.
+    """
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    db.local_storage.connection = db.open_connection(worker=True)
+    db.local_storage.__dict__.pop("readonly_connection", None)
+    DBWriter(conns, restarted).run()
@@ -7,6 +7,7 @@ import sys
 import signal
 import multiprocessing
 import time
+from pathlib import Path
 from typing import Optional
 from rich.console import Console
 from rich.table import Table
@@ -32,11 +33,26 @@ console = Console()
 
 @app.callback()
 def main():
-    """Initialize the database on every command."""
+    """Initialize the database on every command (a no-op once it is current)."""
     db.init_db()
 
 # --- Enqueue ---
 
+def _job_from_spec(data: dict) -> Job:
+    """Builds a Job from a user-supplied JSON object."""
+    if not isinstance(data, dict) or "command" not in data:
+        raise ValueError("'command' field is required in JSON.")
+    job = Job.new(
+        command=data['command'],
+        max_retries=data.get('max_retries', 3),
+        id=data.get('id'),
+        capture_output=bool(data.get('capture_output', False))
+    )
+    if job.capture_output:
+        # The worker names the log file after the id.
+        worker.log_file_name(job.id)
+    return job
+
 @app.command()
 def enqueue(job_json: str = typer.Argument(..., help="Job specification in JSON format.")):
     """Add a new job to the queue."""
@@ -46,11 +62,7 @@ def enqueue(job_json: str = typer.Argument(..., help="Job specification in JSON
             console.print("Error: 'command' field is required in JSON.", style="bold red")
             raise typer.Exit(code=1)
         
-        job = Job(
-            id=data.get('id', Job().id),
-            command=data['command'],
-            max_retries=data.get('max_retries', 3)
-        )
+        job = _job_from_spec(data)
         
         db.add_job(job)
         console.print(f"Job {job.id} enqueued: {job.command}")
@@ -62,6 +74,37 @@ def enqueue(job_json: str = typer.Argument(..., help="Job specification in JSON
         console.print(f"Error: {e}", style="bold red")
         raise typer.Exit(code=1)
 
+@app.command("enqueue-batch")
+def enqueue_batch(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="File with one JSON job specification per line."),
+    chunk_size: int = typer.Option(1000, "--chunk-size", min=1, help="Number of jobs inserted per transaction.")
+):
+    """Add many jobs from a JSON Lines file."""
+    total = 0
+    chunk: list[Job] = []
+    try:
+        with path.open() as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    chunk.append(_job_from_spec(json.loads(line)))
+                except (json.JSONDecodeError, ValueError) as e:
+                    raise ValueError(f"line {line_no}: {e}")
+                
+                if len(chunk) >= chunk_size:
+                    total += len(db.add_jobs(chunk))
+                    chunk = []
+        
+        total += len(db.add_jobs(chunk))
+        console.print(f"{total} job(s) enqueued from {path}")
+        
+    except Exception as e:
+        console.print(f"Error: {e}", style="bold red")
+        if total:
+            console.print(f"{total} job(s) were enqueued before the error.", style="bold yellow")
+        raise typer.Exit(code=1)
+
 # --- Worker Commands ---
 
 @worker_app.command("start")
@@ -131,23 +174,29 @@ def status():
 @app.command("list")
 def list_jobs(state: JobState = typer.Option(JobState.PENDING, "--state", "-s", help="List jobs by state.")):
     """List jobs by their current state."""
-    jobs = db.list_jobs(state)
-    
-    if not jobs:
-        console.print(f"No jobs found with state: {state.value}")
-        return
-        
     table = Table(title=f"{state.value.capitalize()} Jobs")
     table.add_column("Job ID", style="cyan")
     table.add_column("Command", style="yellow")
     table.add_column("Attempts", style="magenta")
     table.add_column("Updated At", style="dim")
     
-    for job in jobs:
-        table.add_row(job.id, job.command, str(job.attempts), job.updated_at)
+    for row in db.iter_jobs(state):
+        table.add_row(row['id'], row['command'], str(row['attempts']), row['updated_at'])
+    
+    if not table.row_count:
+        console.print(f"No jobs found with state: {state.value}")
+        return
         
     console.print(table)
 
+@app.command()
+def archive(
+    older_than_days: float = typer.Option(7, "--older-than-days", "-d", min=0, help="Archive completed/dead jobs not updated for this many days.")
+):
+    """Move old completed and dead jobs out of the active queue."""
+    archived = db.archive_old_jobs(older_than_days)
+    console.print(f"Archived {archived} job(s) older than {older_than_days:g} day(s).")
+
 # --- DLQ Commands ---
 
 @dlq_app.command("list")
@@ -186,7 +235,7 @@ def config_get(key: str = typer.Argument(..., help="Configuration key to view.")
 @config_app.command("list")
 def config_list():
     """List all system configuration values."""
-    with db.get_db_connection() as conn:
+    with db.get_readonly_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT key, value FROM config")
         rows = cursor.fetchall()